@@ -1,16 +1,65 @@
-from fastapi import APIRouter, HTTPException, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, Request, UploadFile, File
 from pydantic import BaseModel
 from typing import List, Dict, Any
+import asyncio
 import logging
 import os
-import shutil
+import sys
+import tempfile
+import uuid
+import anyio
 from datetime import datetime
 from core.services import RAGService
 from core.config import settings
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
-rag_service = RAGService()
+
+def get_rag_service(request: Request) -> RAGService:
+    """Return the RAGService created at application startup."""
+    return request.app.state.rag_service
+
+UPLOAD_CHUNK_SIZE = 1 << 20  # 1 MiB
+
+# Copying between regular files with sendfile(2) is only supported on Linux
+_USE_SENDFILE = sys.platform.startswith("linux") and hasattr(os, "sendfile")
+
+def _sendfile_to_path(src_fd: int, file_path: str) -> None:
+    """Copy an open file descriptor to file_path inside the kernel."""
+    size = os.fstat(src_fd).st_size
+    dst_fd = os.open(file_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o666)
+    try:
+        # Ask for everything that's left; the kernel usually copies the whole
+        # file in one call and only returns short for files over ~2 GiB
+        offset = 0
+        while offset < size:
+            sent = os.sendfile(dst_fd, src_fd, offset, size - offset)
+            if not sent:
+                raise OSError(
+                    f"Upload copy to {file_path} stopped after {offset} of {size} bytes"
+                )
+            offset += sent
+    finally:
+        os.close(dst_fd)
+
+async def _save_upload(file: UploadFile, file_path: str) -> str:
+    """Persist an uploaded file to disk without blocking the event loop."""
+    await file.seek(0)
+
+    # Large uploads are spooled to a real temp file by Starlette; copy those
+    # zero-copy with sendfile instead of bouncing the bytes through Python.
+    spooled = file.file
+    if (_USE_SENDFILE
+            and isinstance(spooled, tempfile.SpooledTemporaryFile)
+            and spooled._rolled):
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, _sendfile_to_path, spooled.fileno(), file_path)
+        return file_path
+
+    async with await anyio.open_file(file_path, "wb") as out:
+        while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+            await out.write(chunk)
+    return file_path
 
 class ChatRequest(BaseModel):
     message: str
@@ -20,7 +69,8 @@ class IndexRequest(BaseModel):
     directory_path: str = "documents"
 
 @router.post("/chat")
-async def chat_endpoint(request: ChatRequest) -> Dict[str, Any]:
+async def chat_endpoint(request: ChatRequest,
+                        rag_service: RAGService = Depends(get_rag_service)) -> Dict[str, Any]:
     """
     Chat endpoint that processes messages and returns responses
     """
@@ -33,12 +83,13 @@ async def chat_endpoint(request: ChatRequest) -> Dict[str, Any]:
     return response
 
 @router.post("/index")
-async def index_endpoint(request: IndexRequest) -> Dict[str, Any]:
+async def index_endpoint(request: IndexRequest,
+                         rag_service: RAGService = Depends(get_rag_service)) -> Dict[str, Any]:
     """
     Index endpoint that processes documents in the specified directory
     """
     logger.info(f"Received index request for directory: {request.directory_path}")
-    response = rag_service.index_documents(request.directory_path)
+    response = await rag_service.index_documents(request.directory_path)
     
     if response["status"] == "error":
         raise HTTPException(status_code=500, detail=response["message"])
@@ -46,38 +97,44 @@ async def index_endpoint(request: IndexRequest) -> Dict[str, Any]:
     return response
 
 @router.post("/upload")
-async def upload_documents(files: List[UploadFile] = File(...)) -> Dict[str, Any]:
+async def upload_documents(files: List[UploadFile] = File(...),
+                           rag_service: RAGService = Depends(get_rag_service)) -> Dict[str, Any]:
     """
     Upload documents to the documents directory and index them.
     """
     try:
         # Create documents directory if it doesn't exist
-        os.makedirs("documents", exist_ok=True)
-        
-        # Save uploaded files with timestamp to avoid name conflicts
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        saved_files = []
+        await anyio.Path("documents").mkdir(parents=True, exist_ok=True)
         
+        # Only allow PDF files
         for file in files:
-            # Only allow PDF files
             if not file.filename.lower().endswith('.pdf'):
                 raise HTTPException(
                     status_code=400,
                     detail=f"File {file.filename} is not a PDF file"
                 )
+        
+        # Save uploaded files concurrently. The timestamp plus a random suffix
+        # keeps every target unique, even for same-named files in one request.
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        save_tasks = [
+            asyncio.ensure_future(_save_upload(
+                file,
+                os.path.join("documents", f"{timestamp}_{uuid.uuid4().hex[:8]}_{file.filename}")
+            ))
+            for file in files
+        ]
+        try:
+            saved_files = await asyncio.gather(*save_tasks)
+        except Exception:
+            # Stop the other saves rather than leave them writing after the error
+            for task in save_tasks:
+                task.cancel()
+            await asyncio.gather(*save_tasks, return_exceptions=True)
+            raise
             
-            # Create unique filename with timestamp
-            filename = f"{timestamp}_{file.filename}"
-            file_path = os.path.join("documents", filename)
-            
-            # Save the file
-            with open(file_path, "wb") as buffer:
-                shutil.copyfileobj(file.file, buffer)
-            
-            saved_files.append(file_path)
-            
-        # Index the documents
-        result = rag_service.index_documents("documents")
+        # Index only the uploaded documents
+        result = await rag_service.index_documents_fast(saved_files)
         
         if result["status"] == "error":
             raise HTTPException(
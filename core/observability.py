@@ -1,4 +1,5 @@
 import os
+import atexit
 import logging
 import functools
 import asyncio
@@ -13,13 +14,14 @@ def serialize_for_langfuse(obj: Any) -> Any:
     """Safely serialize objects for Langfuse."""
     if isinstance(obj, (str, int, float, bool, type(None))):
         return obj
-    elif isinstance(obj, (list, tuple)):
-        return json.dumps([serialize_for_langfuse(item) for item in obj])
-    elif isinstance(obj, dict):
-        return json.dumps({
-            str(k): serialize_for_langfuse(v) 
-            for k, v in obj.items()
-        })
+    elif isinstance(obj, (list, tuple, dict)):
+        # One pass through the C encoder, stringifying anything it can't handle
+        try:
+            return json.dumps(obj, default=str, ensure_ascii=False)
+        except (TypeError, ValueError):
+            # e.g. non-string dict keys or circular references; tracing must
+            # never break the call being traced
+            return str(obj)
     else:
         return str(obj)
 
@@ -39,6 +41,11 @@ except Exception as e:
     logger.warning("Continuing without Langfuse observability")
     langfuse = None
 
+# Events are batched and sent by the SDK's background thread; drain whatever
+# is still queued when the interpreter exits instead of flushing per call.
+if langfuse:
+    atexit.register(langfuse.flush)
+
 def observe_llm(name: Optional[str] = None, 
                 metadata: Optional[Dict[str, Any]] = None):
     """
@@ -49,6 +56,14 @@ def observe_llm(name: Optional[str] = None,
         metadata: Optional metadata to attach to the generation
     """
     def decorator(func):
+        # Fixed for the lifetime of the decorated function, so build them once
+        generation_name = name or func.__name__
+        generation_metadata = {
+            **(metadata or {}),
+            "environment": "local",
+            "service": "rag-chatbot"
+        }
+
         @functools.wraps(func)
         async def async_wrapper(*args, **kwargs):
             if not langfuse:
@@ -70,14 +85,10 @@ def observe_llm(name: Optional[str] = None,
 
                 # Start generation span
                 generation = langfuse.generation(
-                    name=name or func.__name__,
+                    name=generation_name,
                     model=model,
                     model_parameters=clean_params,
-                    metadata={
-                        **(metadata or {}),
-                        "environment": "local",
-                        "service": "rag-chatbot"
-                    },
+                    metadata=generation_metadata,
                     input=serialized_input
                 )
 
@@ -109,12 +120,6 @@ def observe_llm(name: Optional[str] = None,
                     generation.end(error=str(e))
                 logger.error(f"Error in LLM call: {str(e)}")
                 raise
-            finally:
-                if generation:
-                    try:
-                        await langfuse.flush()
-                    except Exception as e:
-                        logger.error(f"Error flushing Langfuse data: {str(e)}")
 
         def sync_wrapper(*args, **kwargs):
             if not langfuse:
@@ -136,14 +141,10 @@ def observe_llm(name: Optional[str] = None,
 
                 # Start generation span
                 generation = langfuse.generation(
-                    name=name or func.__name__,
+                    name=generation_name,
                     model=model,
                     model_parameters=clean_params,
-                    metadata={
-                        **(metadata or {}),
-                        "environment": "local",
-                        "service": "rag-chatbot"
-                    },
+                    metadata=generation_metadata,
                     input=serialized_input
                 )
 
@@ -175,12 +176,6 @@ def observe_llm(name: Optional[str] = None,
                     generation.end(error=str(e))
                 logger.error(f"Error in LLM call: {str(e)}")
                 raise
-            finally:
-                if generation:
-                    try:
-                        langfuse.flush()
-                    except Exception as e:
-                        logger.error(f"Error flushing Langfuse data: {str(e)}")
 
         return async_wrapper if asyncio.iscoroutinefunction(func) else sync_wrapper
     return decorator 
\ No newline at end of file
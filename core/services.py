@@ -1,41 +1,151 @@
+import asyncio
+import functools
 import logging
-from typing import List, Dict, Any
+import multiprocessing
+import uuid
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
 from langchain_community.embeddings import BedrockEmbeddings
 from langchain_community.llms import Bedrock
 from langchain_community.vectorstores import Qdrant
 from langchain.chains import ConversationalRetrievalChain
+from langchain.chains.question_answering.stuff_prompt import PROMPT_SELECTOR as QA_PROMPT_SELECTOR
 from qdrant_client import QdrantClient
 from qdrant_client.http import models
 import boto3
+from botocore.config import Config
 from core.config import settings
 from core.utils import DocumentProcessor
+from langchain.schema import Document
+from langchain_core.callbacks.manager import CallbackManagerForRetrieverRun
+from langchain_core.retrievers import BaseRetriever
 
 logger = logging.getLogger(__name__)
 
-class RAGService:
-    def __init__(self):
-        # Create a boto3 session with credentials
-        self.session = boto3.Session(
-            aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
-            aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
-            region_name=settings.AWS_REGION
+# Payload key the vector store keeps chunk metadata under
+METADATA_PAYLOAD_KEY = Qdrant.METADATA_KEY
+
+# Payload key stored with every indexed chunk identifying the file content and
+# the chunk settings it was split with
+INDEX_KEY = f"{METADATA_PAYLOAD_KEY}.index_key"
+
+@functools.lru_cache(maxsize=None)
+def _boto3_session() -> boto3.Session:
+    """Create the boto3 session with credentials once per process."""
+    return boto3.Session(
+        aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
+        aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
+        region_name=settings.AWS_REGION
+    )
+
+@functools.lru_cache(maxsize=None)
+def _bedrock_client(service_name: str):
+    """Create a Bedrock client once per process and reuse it.
+
+    The connection pool is sized for the concurrent embedding requests made
+    while indexing; botocore's default of 10 would queue them.
+    """
+    return _boto3_session().client(
+        service_name=service_name,
+        region_name=settings.AWS_REGION,
+        config=Config(
+            max_pool_connections=settings.BEDROCK_MAX_POOL_CONNECTIONS,
+            retries={"mode": "adaptive", "max_attempts": 5}
         )
+    )
 
-        # Create Bedrock runtime client
-        self.bedrock_runtime = self.session.client(
-            service_name='bedrock-runtime',
-            region_name=settings.AWS_REGION
+class ParallelBedrockEmbeddings(BedrockEmbeddings):
+    """Bedrock embeddings that embed a batch of documents concurrently.
+
+    Titan has no batch embedding API, so the base class sends one request
+    per text sequentially. Bedrock accepts concurrent invocations, so fan
+    the requests out over a thread pool instead.
+    """
+    max_concurrency: int = 16
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if len(texts) <= 1:
+            return [self.embed_query(text) for text in texts]
+        with ThreadPoolExecutor(max_workers=min(self.max_concurrency, len(texts))) as executor:
+            return list(executor.map(self.embed_query, texts))
+
+class BatchQdrant(Qdrant):
+    """Qdrant vector store that can run several similarity searches in one request."""
+
+    def similarity_search_with_score_by_vectors(
+        self,
+        embeddings: List[List[float]],
+        k: int = 4,
+        filter: Optional[models.Filter] = None,
+        score_threshold: Optional[float] = None
+    ) -> List[List[Tuple[Document, float]]]:
+        """Search for each embedding with a single search_batch call."""
+        requests = [
+            models.SearchRequest(
+                vector=models.NamedVector(name=self.vector_name, vector=embedding)
+                if self.vector_name else embedding,
+                filter=filter,
+                limit=k,
+                score_threshold=score_threshold,
+                with_payload=True
+            )
+            for embedding in embeddings
+        ]
+        results = self.client.search_batch(
+            collection_name=self.collection_name,
+            requests=requests
         )
+        return [
+            [
+                (
+                    Document(
+                        page_content=point.payload.get(self.content_payload_key),
+                        metadata=point.payload.get(self.metadata_payload_key) or {}
+                    ),
+                    point.score
+                )
+                for point in points
+            ]
+            for points in results
+        ]
 
-        # Create Bedrock client
-        self.bedrock = self.session.client(
-            service_name='bedrock',
-            region_name=settings.AWS_REGION
+class BatchQdrantRetriever(BaseRetriever):
+    """Retriever whose searches go through BatchQdrant's search_batch.
+
+    Callers that already have query embeddings can pass them in directly, and
+    several queries are answered by one Qdrant request.
+    """
+    vector_store: BatchQdrant
+    k: int = 4
+    score_threshold: Optional[float] = None
+
+    class Config:
+        arbitrary_types_allowed = True
+
+    def get_relevant_documents_by_vectors(self, embeddings: List[List[float]]) -> List[List[Document]]:
+        """Return the documents relevant to each query embedding, in order."""
+        results = self.vector_store.similarity_search_with_score_by_vectors(
+            embeddings, k=self.k, score_threshold=self.score_threshold
         )
+        return [[doc for doc, _ in docs_and_scores] for docs_and_scores in results]
 
-        self.embeddings = BedrockEmbeddings(
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        embedding = self.vector_store.embeddings.embed_query(query)
+        return self.get_relevant_documents_by_vectors([embedding])[0]
+
+class RAGService:
+    def __init__(self):
+        # Shared boto3 session and Bedrock clients
+        self.session = _boto3_session()
+        self.bedrock_runtime = _bedrock_client('bedrock-runtime')
+        self.bedrock = _bedrock_client('bedrock')
+
+        self.embeddings = ParallelBedrockEmbeddings(
             client=self.bedrock_runtime,
-            model_id="amazon.titan-embed-text-v1"
+            model_id="amazon.titan-embed-text-v1",
+            max_concurrency=settings.EMBEDDING_MAX_CONCURRENCY
         )
         
         self.llm = Bedrock(
@@ -44,29 +154,30 @@ class RAGService:
             model_kwargs={"temperature": 0.7, "max_tokens_to_sample": 500}
         )
         
+        # gRPC sends vectors as packed floats rather than JSON
         self.qdrant_client = QdrantClient(
             host=settings.QDRANT_HOST,
-            port=settings.QDRANT_PORT
+            port=settings.QDRANT_PORT,
+            grpc_port=settings.QDRANT_GRPC_PORT,
+            prefer_grpc=settings.QDRANT_PREFER_GRPC
         )
         
         # Initialize Qdrant collection if it doesn't exist
         self._init_qdrant_collection()
         
         # Create vector store without search_kwargs
-        self.vector_store = Qdrant(
+        self.vector_store = BatchQdrant(
             client=self.qdrant_client,
             collection_name=settings.QDRANT_COLLECTION_NAME,
-            embeddings=self.embeddings
+            embeddings=self.embeddings,
+            metadata_payload_key=METADATA_PAYLOAD_KEY
         )
         
-        # Configure retriever with search parameters
-        self.retriever = self.vector_store.as_retriever(
-            search_type="similarity_score_threshold",
-            search_kwargs={
-                "k": settings.SEARCH_TOP_K,
-                "score_threshold": 0.0,  # Start with no threshold to see all matches
-                "filter": None  # No filtering initially
-            }
+        # Configure retriever with search parameters; no score threshold or
+        # filter so all matches are returned
+        self.retriever = BatchQdrantRetriever(
+            vector_store=self.vector_store,
+            k=settings.SEARCH_TOP_K
         )
         
         # Create conversation chain with configured retriever
@@ -74,15 +185,28 @@ class RAGService:
             llm=self.llm,
             retriever=self.retriever,
             return_source_documents=True,
-            verbose=True,
+            verbose=settings.DEBUG,
             chain_type="stuff"
         )
         
+        # One long-lived pool for PDF processing. Spawn rather than fork: this
+        # process holds gRPC channels, connection pools and background threads
+        # that are not safe to copy into a child.
+        self.process_pool = ProcessPoolExecutor(
+            mp_context=multiprocessing.get_context("spawn")
+        )
+        
         self.document_processor = DocumentProcessor(
             chunk_size=settings.CHUNK_SIZE,
-            chunk_overlap=settings.CHUNK_OVERLAP
+            chunk_overlap=settings.CHUNK_OVERLAP,
+            cache_path=settings.DOCUMENT_CACHE_PATH,
+            executor=self.process_pool
         )
 
+    def close(self):
+        """Release resources held by the service."""
+        self.process_pool.shutdown(wait=False, cancel_futures=True)
+
     def _init_qdrant_collection(self):
         """Initialize Qdrant collection if it doesn't exist."""
         try:
@@ -99,20 +223,153 @@ class RAGService:
                     )
                 )
                 logger.info(f"Collection {settings.QDRANT_COLLECTION_NAME} created successfully")
+
+            # Index the keys so already indexed files can be looked up cheaply
+            self.qdrant_client.create_payload_index(
+                collection_name=settings.QDRANT_COLLECTION_NAME,
+                field_name=INDEX_KEY,
+                field_schema=models.PayloadSchemaType.KEYWORD
+            )
         except Exception as e:
             logger.error(f"Error initializing Qdrant collection: {str(e)}")
             raise
 
-    def index_documents(self, directory_path: str) -> Dict[str, Any]:
-        """Index documents from the specified directory."""
+    @staticmethod
+    def _index_key_filter(index_keys: List[str]) -> models.Filter:
+        return models.Filter(must=[
+            models.FieldCondition(key=INDEX_KEY, match=models.MatchAny(any=index_keys))
+        ])
+
+    def _is_indexed(self, index_key: str) -> bool:
+        """Check whether chunks with this index key are in Qdrant."""
+        points, _ = self.qdrant_client.scroll(
+            collection_name=settings.QDRANT_COLLECTION_NAME,
+            scroll_filter=self._index_key_filter([index_key]),
+            limit=1,
+            with_payload=False,
+            with_vectors=False
+        )
+        return bool(points)
+
+    def _delete_indexed(self, index_keys: List[str]) -> None:
+        """Remove all chunks with the given index keys from Qdrant."""
+        self.qdrant_client.delete(
+            collection_name=settings.QDRANT_COLLECTION_NAME,
+            points_selector=models.FilterSelector(filter=self._index_key_filter(index_keys))
+        )
+
+    def _filter_indexed_documents(self, documents: List[Document]) -> List[Document]:
+        """Drop chunks of files already indexed with the current chunk settings."""
+        # First source seen for each index key; identical files in the same
+        # batch are only indexed once
+        sources_by_key = {}
+        for doc in documents:
+            index_key = doc.metadata.get("index_key")
+            if index_key:
+                sources_by_key.setdefault(index_key, doc.metadata["source"])
+
+        skipped = {
+            index_key for index_key in sources_by_key
+            if self._is_indexed(index_key)
+        }
+        if skipped:
+            logger.info(f"Skipping {len(skipped)} already indexed files")
+
+        def should_index(doc: Document) -> bool:
+            index_key = doc.metadata.get("index_key")
+            if not index_key:
+                return True
+            return (index_key not in skipped
+                    and sources_by_key[index_key] == doc.metadata["source"])
+
+        return [doc for doc in documents if should_index(doc)]
+
+    def _upload_documents(self, documents: List[Document]) -> None:
+        """Embed chunks and upload them straight to Qdrant, one batch at a time."""
+        # Embed and upload per batch so only one batch of vectors is held in
+        # memory at a time, however large the directory being indexed
+        for start in range(0, len(documents), settings.INDEX_BATCH_SIZE):
+            batch = documents[start:start + settings.INDEX_BATCH_SIZE]
+            vectors = self.embeddings.embed_documents([doc.page_content for doc in batch])
+            self.qdrant_client.upload_collection(
+                collection_name=settings.QDRANT_COLLECTION_NAME,
+                vectors=vectors,
+                # Same payload layout as the LangChain wrapper so retrieval keeps working
+                payload=[
+                    {
+                        self.vector_store.content_payload_key: doc.page_content,
+                        self.vector_store.metadata_payload_key: doc.metadata
+                    }
+                    for doc in batch
+                ],
+                ids=[uuid.uuid4().hex for _ in batch],
+                batch_size=settings.INDEX_BATCH_SIZE,
+                parallel=settings.QDRANT_UPLOAD_PARALLEL,
+                # Return only once Qdrant has applied the points, so they are
+                # searchable and any failure is raised here
+                wait=True
+            )
+
+    async def _index(self, process: Callable[[Any], List[Document]], source: Any) -> Dict[str, Any]:
+        """Process documents from source and index the ones not yet in Qdrant."""
         try:
-            documents = self.document_processor.process_documents_directory(directory_path)
-            self.vector_store.add_documents(documents)
+            loop = asyncio.get_running_loop()
+            documents = await loop.run_in_executor(None, process, source)
+            documents = await loop.run_in_executor(
+                None, self._filter_indexed_documents, documents
+            )
+            try:
+                await loop.run_in_executor(None, self._upload_documents, documents)
+            except Exception:
+                # Don't leave files half indexed: a partial upload would make
+                # them look indexed and skip them on every retry
+                index_keys = list({
+                    doc.metadata["index_key"] for doc in documents
+                    if doc.metadata.get("index_key")
+                })
+                if index_keys:
+                    try:
+                        await loop.run_in_executor(None, self._delete_indexed, index_keys)
+                    except Exception as e:
+                        logger.error(f"Error removing partially indexed documents: {str(e)}")
+                raise
             return {"status": "success", "message": f"Indexed {len(documents)} documents"}
         except Exception as e:
             logger.error(f"Error indexing documents: {str(e)}")
             return {"status": "error", "message": str(e)}
 
+    async def index_documents(self, directory_path: str) -> Dict[str, Any]:
+        """Index documents from the specified directory."""
+        return await self._index(
+            self.document_processor.process_documents_directory, directory_path
+        )
+
+    async def index_documents_fast(self, file_paths: List[str]) -> Dict[str, Any]:
+        """Index only the given PDF files."""
+        return await self._index(self.document_processor.process_pdf_files, file_paths)
+
+    @staticmethod
+    def _format_source(doc: Document, preview_length: int = 200) -> Dict[str, Any]:
+        """Summarise a source document for the chat response."""
+        content = doc.page_content
+        if len(content) > preview_length:
+            content = content[:preview_length] + "…"
+        return {
+            "source": doc.metadata["source"],
+            "page": doc.metadata.get("page", 1),
+            "content": content,
+            "score": getattr(doc, "score", None)  # Include score if available
+        }
+
+    async def _answer_from_documents(self, question: str, documents: List[Document]) -> Dict[str, Any]:
+        """Answer a standalone question with the "stuff" QA prompt in one LLM call."""
+        prompt = QA_PROMPT_SELECTOR.get_prompt(self.llm).format(
+            context="\n\n".join(doc.page_content for doc in documents),
+            question=question
+        )
+        answer = await self.llm.ainvoke(prompt)
+        return {"answer": answer, "source_documents": documents}
+
     async def chat(self, message: str, chat_history: List = None) -> Dict[str, Any]:
         """Process a chat message and return the response."""
         if chat_history is None:
@@ -126,33 +383,31 @@ class RAGService:
             query_embedding = await self.embeddings.aembed_query(message)
             logger.info(f"Query embedding size: {len(query_embedding)}")
 
-            # Get relevant documents directly first for debugging
-            relevant_docs = await self.retriever.aget_relevant_documents(message)
+            # Search with the embedding above rather than embedding the message again
+            loop = asyncio.get_running_loop()
+            relevant_docs = (await loop.run_in_executor(
+                None, self.retriever.get_relevant_documents_by_vectors, [query_embedding]
+            ))[0]
             logger.info(f"Retrieved {len(relevant_docs)} documents directly from retriever")
             for i, doc in enumerate(relevant_docs):
                 logger.info(f"Document {i+1}: {doc.metadata.get('source', 'unknown')}")
                 logger.info(f"Content preview: {doc.page_content[:100]}...")
 
-            # Now proceed with the conversation chain
-            response = await self.conversation_chain.ainvoke({
-                "question": message,
-                "chat_history": chat_history
-            })
-            
-            sources_with_scores = [
-                {
-                    "source": doc.metadata["source"],
-                    "page": doc.metadata.get("page", 1),
-                    "content": doc.page_content[:200] + "...",
-                    "score": getattr(doc, "score", None)  # Include score if available
-                }
-                for doc in response["source_documents"]
-            ]
+            if chat_history:
+                # The chain condenses the question against the history first
+                response = await self.conversation_chain.ainvoke({
+                    "question": message,
+                    "chat_history": chat_history
+                })
+            else:
+                # Nothing to condense; answer from the documents retrieved above
+                # instead of letting the chain run the same retrieval again
+                response = await self._answer_from_documents(message, relevant_docs)
             
             return {
                 "status": "success",
                 "response": response["answer"],
-                "sources": sources_with_scores,
+                "sources": [self._format_source(doc) for doc in response["source_documents"]],
                 "embedding_size": len(query_embedding)  # Include embedding size for verification
             }
         except Exception as e:
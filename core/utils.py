@@ -1,18 +1,44 @@
 import os
-from typing import List
+import hashlib
+import json
+import sqlite3
+from contextlib import closing
+from concurrent.futures import Executor
+from itertools import chain, repeat
+from typing import List, Optional
 import logging
 from PIL import Image
 import pytesseract
+import fitz
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain.schema import Document
-from langchain_community.document_loaders import PyMuPDFLoader
 
 logger = logging.getLogger(__name__)
 
+def file_sha1(file_path: str, block_size: int = 1 << 20) -> str:
+    """Return the SHA-1 hex digest of a file's contents."""
+    digest = hashlib.sha1()
+    with open(file_path, 'rb') as file:
+        while block := file.read(block_size):
+            digest.update(block)
+    return digest.hexdigest()
+
+def _process_pdf_worker(file_path: str, chunk_size: int, chunk_overlap: int,
+                        cache_path: Optional[str]) -> List[Document]:
+    """Process a single PDF in a worker process."""
+    return DocumentProcessor(chunk_size, chunk_overlap, cache_path).process_pdf(file_path)
+
 class DocumentProcessor:
-    def __init__(self, chunk_size: int = 1000, chunk_overlap: int = 200):
+    def __init__(self, chunk_size: int = 1000, chunk_overlap: int = 200,
+                 cache_path: Optional[str] = None,
+                 executor: Optional[Executor] = None):
         self.chunk_size = chunk_size
         self.chunk_overlap = chunk_overlap
+        self.cache_path = cache_path
+        # Pool used to process several PDFs in parallel; owned by the caller
+        self.executor = executor
+        if cache_path:
+            os.makedirs(os.path.dirname(cache_path) or ".", exist_ok=True)
         self.text_splitter = RecursiveCharacterTextSplitter(
             chunk_size=self.chunk_size,
             chunk_overlap=self.chunk_overlap,
@@ -37,23 +63,85 @@ class DocumentProcessor:
             logger.error(f"Error processing text file {file_path}: {str(e)}")
             return []
 
+    def _cache_key(self, content_hash: str) -> str:
+        """Key identifying a file's chunks: its content plus the chunk settings."""
+        return f"{content_hash}:{self.chunk_size}:{self.chunk_overlap}"
+
+    def _connect_cache(self) -> sqlite3.Connection:
+        # One short-lived connection per call so worker processes never share one
+        connection = sqlite3.connect(self.cache_path, timeout=30)
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS splits (key TEXT PRIMARY KEY, documents TEXT NOT NULL)"
+        )
+        return connection
+
+    def _load_cached_splits(self, content_hash: str) -> Optional[List[Document]]:
+        """Return cached chunks for the given content hash, if any."""
+        if not self.cache_path:
+            return None
+        try:
+            with closing(self._connect_cache()) as connection, connection:
+                row = connection.execute(
+                    "SELECT documents FROM splits WHERE key = ?",
+                    (self._cache_key(content_hash),)
+                ).fetchone()
+        except sqlite3.Error as e:
+            logger.warning(f"Error reading split cache: {str(e)}")
+            return None
+        if row is None:
+            return None
+        return [
+            Document(page_content=page_content, metadata=metadata)
+            for page_content, metadata in json.loads(row[0])
+        ]
+
+    def _store_cached_splits(self, content_hash: str, splits: List[Document]) -> None:
+        """Store chunks for the given content hash."""
+        if not self.cache_path:
+            return
+        payload = json.dumps([[doc.page_content, doc.metadata] for doc in splits])
+        try:
+            with closing(self._connect_cache()) as connection, connection:
+                connection.execute(
+                    "INSERT OR REPLACE INTO splits (key, documents) VALUES (?, ?)",
+                    (self._cache_key(content_hash), payload)
+                )
+        except sqlite3.Error as e:
+            logger.warning(f"Error writing split cache: {str(e)}")
+
     def process_pdf(self, file_path: str) -> List[Document]:
         """Process a single PDF file and return chunks."""
         try:
+            content_hash = file_sha1(file_path)
+            cached = self._load_cached_splits(content_hash)
+            if cached is not None:
+                logger.info(f"Using cached chunks for PDF file: {file_path}")
+                # The same content may have been uploaded under another name
+                for doc in cached:
+                    doc.metadata["source"] = file_path
+                    doc.metadata["index_key"] = self._cache_key(content_hash)
+                return cached
+
             logger.info(f"Processing PDF file: {file_path}")
-            loader = PyMuPDFLoader(file_path)
-            documents = loader.load()
+            # Read page text with PyMuPDF directly rather than building a
+            # loader Document per page only to split it again
+            with fitz.open(file_path) as pdf:
+                texts = [page.get_text("text") for page in pdf]
             
-            splits = []
-            for doc in documents:
-                doc_splits = self.text_splitter.split_text(doc.page_content)
-                splits.extend([
-                    Document(
-                        page_content=split,
-                        metadata={"source": file_path, "page": doc.metadata.get("page", 0)}
-                    ) for split in doc_splits
-                ])
+            splits = self.text_splitter.create_documents(
+                texts,
+                metadatas=[
+                    {
+                        "source": file_path,
+                        "page": page_number,
+                        "content_hash": content_hash,
+                        "index_key": self._cache_key(content_hash)
+                    }
+                    for page_number in range(len(texts))
+                ]
+            )
             
+            self._store_cached_splits(content_hash, splits)
             return splits
         except Exception as e:
             logger.error(f"Error processing PDF file {file_path}: {str(e)}")
@@ -76,21 +164,34 @@ class DocumentProcessor:
             logger.error(f"Error processing image file {file_path}: {str(e)}")
             return []
 
+    def process_pdf_files(self, file_paths: List[str]) -> List[Document]:
+        """Process the given PDF files and return their chunks."""
+        # A single file isn't worth the round trip to a worker process
+        if self.executor is None or len(file_paths) <= 1:
+            return list(chain.from_iterable(self.process_pdf(path) for path in file_paths))
+
+        # Loading and splitting are CPU bound, so spread files across processes
+        results = self.executor.map(
+            _process_pdf_worker,
+            file_paths,
+            repeat(self.chunk_size),
+            repeat(self.chunk_overlap),
+            repeat(self.cache_path),
+        )
+        return list(chain.from_iterable(results))
+
     def process_documents_directory(self, directory_path: str) -> List[Document]:
         """Process all PDF files in the specified directory."""
-        all_documents = []
-        
         try:
-            # Process only PDF files
-            pdf_files = [
-                os.path.join(directory_path, f) 
-                for f in os.listdir(directory_path) 
-                if f.lower().endswith('.pdf')
-            ]
+            # Process only PDF files; DirEntry.is_file() avoids an extra stat call
+            with os.scandir(directory_path) as entries:
+                pdf_files = [
+                    entry.path
+                    for entry in entries
+                    if entry.name[-4:].lower() == '.pdf' and entry.is_file()
+                ]
             
-            for pdf_file in pdf_files:
-                chunks = self.process_pdf(pdf_file)
-                all_documents.extend(chunks)
+            all_documents = self.process_pdf_files(pdf_files)
             
             logger.info(f"Processed {len(all_documents)} documents in total")
             return all_documents
@@ -1,7 +1,10 @@
+import asyncio
+import sys
 import uvicorn
 from fastapi import FastAPI
 from api.endpoints import router
 from core.config import settings
+from core.services import RAGService
 import logging
 
 logger = logging.getLogger(__name__)
@@ -14,6 +17,31 @@ app = FastAPI(
 
 app.include_router(router)
 
+@app.on_event("startup")
+async def init_rag_service():
+    """Create the RAG service once the app starts rather than at import time."""
+    # Building the service connects to Bedrock and Qdrant synchronously
+    loop = asyncio.get_running_loop()
+    app.state.rag_service = await loop.run_in_executor(None, RAGService)
+
+@app.on_event("shutdown")
+async def close_rag_service():
+    """Shut down the RAG service's worker processes."""
+    rag_service = getattr(app.state, "rag_service", None)
+    if rag_service:
+        rag_service.close()
+
+@app.on_event("shutdown")
+async def flush_langfuse():
+    """Send any queued Langfuse events before the worker exits."""
+    # Only flush if something imported the tracing module; importing it here
+    # would create the client and contact Langfuse just to shut down
+    observability = sys.modules.get("core.observability")
+    langfuse = getattr(observability, "langfuse", None)
+    if langfuse:
+        # flush() is a blocking call; keep it off the event loop
+        await asyncio.get_running_loop().run_in_executor(None, langfuse.flush)
+
 if __name__ == "__main__":
     logger.info("Starting RAG Chatbot API")
     uvicorn.run(